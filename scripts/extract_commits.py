@@ -9,6 +9,13 @@ Usage:
     python extract_commits.py --repos /path/to/repo1 /path/to/repo2
     python extract_commits.py --parent-dir /path/to/repos_dir
     python extract_commits.py --repos /path/to/repo1 --output custom_commits.json
+    python extract_commits.py --repos /path/to/repo1 --output commits.json.zst
+    python extract_commits.py --repos /path/to/repo1 --skip-hunks
+    python extract_commits.py --repos /path/to/repo1 --cache-dir .commits_cache
+
+Installing orjson (pip install orjson) makes JSON serialization considerably faster;
+the standard library json module is used when it is not available. Output is gzip
+compressed, or zstd compressed (requires pip install zstandard) if it ends in .zst.
 """
 
 import argparse
@@ -18,43 +25,129 @@ import os
 import re
 import subprocess
 import sys
-from datetime import datetime
-from multiprocessing import Pool, cpu_count, Process, Queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from multiprocessing import cpu_count, get_all_start_methods, get_context
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from queue import Full, Queue
+from typing import IO, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard as zstd
+except ImportError:
+    zstd = None
 
 # Sentinel value to signal end of commits
 DONE = None
 
+# Marker starting each commit header in the streamed `git log` output, and the
+# separator between header fields (hash, timestamp, author, parents, subject)
+COMMIT_START = b"\x02"
+FIELD_SEP = b"\x01"
+LOG_FORMAT = "--pretty=format:%x02%H%x01%ct%x01%aN%x01%P%x01%s"
+
+# Each commit after the first starts right after this in the stream
+COMMIT_BOUNDARY = b"\n" + COMMIT_START
+
+# Size of the reads from a streaming git process
+READ_SIZE = 1 << 20
+
+# Start of each per-file diff section within a commit
+DIFF_HEADER = b"\ndiff --git "
+
+# Change type for each status letter of a raw file change line
+CHANGE_TYPES = {
+    b'A': 'Add',
+    b'D': 'Delete',
+    b'M': 'Modify',
+    b'R': 'Rename',
+    b'C': 'Copy',
+    b'T': 'Type'
+}
+
+# Diff hunk header: @@ -old_start,old_count +new_start,new_count @@
+_HUNK_RE = re.compile(rb'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+
+# Hash at the start of a serialized commit (orjson or json formatting)
+_CACHED_HASH_RE = re.compile(rb'\{"hash": ?"([0-9a-f]+)"')
+
+# Version of the serialized commit format, part of every cache file name; bump it
+# whenever the output schema or parsing changes so stale caches are not reused
+CACHE_FORMAT_VERSION = 1
+
+# Supported remote URL hosts, capturing (org, repo)
+_REMOTE_RE = re.compile(r'(?:github\.com|gitlab\.com|bitbucket\.org)[:/]([^/]+)/([^/]+?)(?:\.git)?/?$')
+
+# Maximum number of batches waiting for the writer before readers block
+WRITER_QUEUE_SIZE = 64
+
+# Seconds a reader waits on a full writer queue before checking the writer is still alive
+WRITER_POLL_INTERVAL = 0.5
+
+# Number of commits handed to a parse worker at once
+CHUNK_SIZE = 64
 
-def run_git_command(repo_path: str, command: List[str]) -> Tuple[str, int]:
-    """Run a git command in the specified repository."""
+# Start method for parse workers; the writer thread is already running when they
+# start, and forking a multi-threaded process can deadlock the child
+WORKER_START_METHOD = "forkserver" if "forkserver" in get_all_start_methods() else "spawn"
+
+# Repository context of a parse worker, set once by _init_worker
+_worker_org = None
+_worker_repo = None
+
+
+def run_git_command(repo_path: str, command: List[str]) -> Tuple[bytes, int]:
+    """Run a git command in the specified repository. Returns raw stdout bytes."""
     try:
         result = subprocess.run(
             ["git"] + command,
             cwd=repo_path,
             capture_output=True,
-            text=False,  # Get bytes first
             check=False
         )
-        # Decode with error handling for binary/non-UTF8 content
-        try:
-            stdout = result.stdout.decode('utf-8', errors='replace')
-        except (UnicodeDecodeError, AttributeError):
-            # Fallback: try with surrogateescape for better binary handling
-            stdout = result.stdout.decode('utf-8', errors='surrogateescape')
-        return stdout, result.returncode
+        return result.stdout, result.returncode
     except Exception as e:
         print(f"Error running git command: {e}", file=sys.stderr)
-        return "", 1
+        return b"", 1
+
+
+def stream_git(repo_path: str, command: List[str], stdin_data: Optional[bytes] = None) -> subprocess.Popen:
+    """
+    Start a git command in the specified repository, streaming its stdout through a pipe.
+    If stdin_data is given it is written to the command's stdin first, so it must be
+    a command that reads all of its input before producing output (e.g. git log --stdin).
+    """
+    proc = subprocess.Popen(
+        ["git"] + command,
+        cwd=repo_path,
+        stdin=subprocess.PIPE if stdin_data is not None else None,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        bufsize=READ_SIZE
+    )
+    if stdin_data is not None:
+        proc.stdin.write(stdin_data)
+        proc.stdin.close()
+    return proc
 
 
+@lru_cache(maxsize=None)
 def is_git_repo(repo_path: str) -> bool:
     """Check if the given path is a Git repository."""
     stdout, returncode = run_git_command(repo_path, ["rev-parse", "--is-inside-work-tree"])
-    return returncode == 0 and stdout.strip() == "true"
+    return returncode == 0 and stdout.strip() == b"true"
 
 
+@lru_cache(maxsize=None)
 def get_repo_info(repo_path: str) -> Tuple[str, str]:
     """
     Extract organization and repository name from git remote URL.
@@ -64,27 +157,15 @@ def get_repo_info(repo_path: str) -> Tuple[str, str]:
     stdout, returncode = run_git_command(repo_path, ["remote", "get-url", "origin"])
     
     if returncode == 0 and stdout.strip():
-        remote_url = stdout.strip()
+        remote_url = stdout.strip().decode('utf-8', errors='replace')
         # Parse various remote URL formats:
         # https://github.com/org/repo.git
         # https://github.com/org/repo
         # git@github.com:org/repo.git
         # git@github.com:org/repo
-        
-        # Remove .git suffix
-        remote_url = remote_url.rstrip('.git')
-        
-        # Match patterns
-        patterns = [
-            r'github\.com[:/]([^/]+)/([^/]+?)(?:\.git)?/?$',
-            r'gitlab\.com[:/]([^/]+)/([^/]+?)(?:\.git)?/?$',
-            r'bitbucket\.org[:/]([^/]+)/([^/]+?)(?:\.git)?/?$',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, remote_url)
-            if match:
-                return (match.group(1), match.group(2))
+        match = _REMOTE_RE.search(remote_url)
+        if match:
+            return (match.group(1), match.group(2))
     
     # Fallback: use directory name as repo, try to infer org from path
     repo_name = os.path.basename(os.path.abspath(repo_path))
@@ -101,54 +182,49 @@ def get_repo_info(repo_path: str) -> Tuple[str, str]:
     return (org, repo_name)
 
 
-def get_commit_hashes(repo_path: str) -> List[str]:
-    """Get all commit hashes in reverse chronological order (including merge commits)."""
-    stdout, returncode = run_git_command(
-        repo_path,
-        ["log", "--reverse", "--pretty=%H"]
-    )
-    if returncode != 0:
-        return []
-    return [h.strip() for h in stdout.strip().split("\n") if h.strip()]
+def get_file_extension(path: bytes) -> str:
+    """Get the extension of a path, like Path(path).suffix but without building a Path."""
+    name_start = path.rfind(b"/") + 1
+    dot = path.rfind(b".", name_start)
+    # A leading dot (e.g. ".gitignore") or a trailing dot does not start an extension
+    if name_start < dot < len(path) - 1:
+        return path[dot:].decode('utf-8', errors='replace')
+    return ""
 
 
-def parse_file_change(line: str) -> Optional[Dict]:
+def parse_file_change(line: bytes) -> Optional[Dict]:
     """
-    Parse a file change line from git show --raw output.
+    Parse a file change line from git log --raw output.
     
-    Format: :old_mode new_mode old_sha new_sha status[ score] path [old_path]
-    Example: :100644 100644 abc123 def456 M 100 file.txt
-    Example: :100644 100644 abc123 def456 R100 80 old.txt new.txt
+    Format: :old_mode new_mode old_sha new_sha status[score]<TAB>path[<TAB>new_path]
+    Example: :100644 100644 abc123 def456 M<TAB>file.txt
+    Example: :100644 100644 abc123 def456 R080<TAB>old.txt<TAB>new.txt
     """
-    # Pattern matches: :mode mode sha sha status[ score] path [old_path]
-    pattern = r'^:(\d+)\s+(\d+)\s+([a-f0-9]+)\s+([a-f0-9]+)\s+([ADMRCT])(\d+)?\s+(.+)$'
-    match = re.match(pattern, line)
-    if not match:
+    # The fields before the first tab are fixed and space separated, so split
+    # them directly instead of matching a regex against every line
+    fields, _, paths = line.partition(b"\t")
+    fields = fields.split(b" ")
+    if len(fields) != 5 or not fields[0].startswith(b":") or not paths:
         return None
     
-    old_mode, new_mode, old_sha, new_sha, status, score, paths = match.groups()
+    status = fields[4][:1]
+    if status not in CHANGE_TYPES:
+        return None
     
     # Parse paths (may be one or two paths for rename/copy)
-    path_parts = paths.split("\t")
+    path_parts = paths.split(b"\t")
+    new_path_bytes = path_parts[-1]
     if len(path_parts) == 2:
-        old_path, new_path = path_parts
+        old_path = path_parts[0].decode('utf-8', errors='replace')
     else:
         old_path = None
-        new_path = path_parts[0]
+    new_path = new_path_bytes.decode('utf-8', errors='replace')
     
     # Determine change type
-    change_type_map = {
-        'A': 'Add',
-        'D': 'Delete',
-        'M': 'Modify',
-        'R': 'Rename',
-        'C': 'Copy',
-        'T': 'Type'
-    }
-    change_type = change_type_map.get(status, 'Modify')
+    change_type = CHANGE_TYPES[status]
     
     # Get file extension
-    file_extension = Path(new_path).suffix if new_path else Path(old_path).suffix if old_path else ""
+    file_extension = get_file_extension(new_path_bytes)
     
     return {
         "change_type": change_type,
@@ -163,15 +239,14 @@ def parse_file_change(line: str) -> Optional[Dict]:
     }
 
 
-def parse_diff_hunk(hunk_header: str) -> Tuple[int, int, int, int]:
+def parse_diff_hunk(hunk_header: bytes) -> Tuple[int, int, int, int]:
     """
     Parse a diff hunk header to extract line information.
     
     Format: @@ -old_start,old_count +new_start,new_count @@
     Returns: (old_start, old_count, new_start, new_count)
     """
-    pattern = r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@'
-    match = re.match(pattern, hunk_header)
+    match = _HUNK_RE.match(hunk_header)
     if not match:
         return (0, 0, 0, 0)
     
@@ -183,48 +258,35 @@ def parse_diff_hunk(hunk_header: str) -> Tuple[int, int, int, int]:
     return (old_start, old_count, new_start, new_count)
 
 
-def analyze_diff(diff_lines: List[str], file_change: Dict) -> Dict:
-    """Analyze diff lines to count additions, deletions, and hunks."""
+def analyze_diff(diff_blob: bytes, file_change: Dict) -> Dict:
+    """
+    Analyze a file's diff section to count additions, deletions, and hunks.
+
+    Works on the whole section at once with bytes.count/split so the scanning
+    happens in C rather than in a Python loop over every diff line.
+    """
     lines_added = 0
     lines_deleted = 0
     hunks_added = 0
     hunks_removed = 0
     hunks_changed = 0
     
-    in_hunk = False
-    current_hunk_has_additions = False
-    current_hunk_has_deletions = False
-    
-    for line in diff_lines:
-        if line.startswith("@@"):
-            # New hunk
-            if in_hunk:
-                # Process previous hunk
-                if current_hunk_has_additions and current_hunk_has_deletions:
-                    hunks_changed += 1
-                elif current_hunk_has_additions:
-                    hunks_added += 1
-                elif current_hunk_has_deletions:
-                    hunks_removed += 1
-            
-            in_hunk = True
-            current_hunk_has_additions = False
-            current_hunk_has_deletions = False
-        elif line.startswith("+") and not line.startswith("+++"):
-            lines_added += 1
-            current_hunk_has_additions = True
-        elif line.startswith("-") and not line.startswith("---"):
-            lines_deleted += 1
-            current_hunk_has_deletions = True
-    
-    # Process last hunk
-    if in_hunk:
-        if current_hunk_has_additions and current_hunk_has_deletions:
-            hunks_changed += 1
-        elif current_hunk_has_additions:
-            hunks_added += 1
-        elif current_hunk_has_deletions:
-            hunks_removed += 1
+    # The ---/+++ file headers only appear before the first hunk, so skip them
+    hunks_start = diff_blob.find(b"\n@@")
+    if hunks_start != -1:
+        body = diff_blob[hunks_start:]
+        lines_added = body.count(b"\n+")
+        lines_deleted = body.count(b"\n-")
+        
+        for hunk in body.split(b"\n@@")[1:]:
+            hunk_has_additions = b"\n+" in hunk
+            hunk_has_deletions = b"\n-" in hunk
+            if hunk_has_additions and hunk_has_deletions:
+                hunks_changed += 1
+            elif hunk_has_additions:
+                hunks_added += 1
+            elif hunk_has_deletions:
+                hunks_removed += 1
     
     file_change["lines_added"] = lines_added
     file_change["lines_deleted"] = lines_deleted
@@ -235,147 +297,190 @@ def analyze_diff(diff_lines: List[str], file_change: Dict) -> Dict:
     return file_change
 
 
-def find_file_change_by_path(file_changes_dict: Dict, path: str) -> Optional[Dict]:
-    """Find a file_change in the dict by matching path or old_path."""
-    for fc in file_changes_dict.values():
-        if fc["path"] == path or (fc.get("old_path") and fc["old_path"] == path):
-            return fc
-    return None
+def iter_commits(stdout: IO[bytes]) -> Iterator[bytes]:
+    """
+    Split a streaming `git log --raw --patch` output into individual commits.
+
+    Every commit starts with a header line prefixed by COMMIT_START, followed by
+    its raw file change lines (starting with ':') and then its diff sections.
+    The stream is read in READ_SIZE chunks and each commit's complete block of
+    bytes is yielded as soon as the start of the next one has been read.
+    """
+    buffer = bytearray()
+    search_from = 0
+    
+    while True:
+        data = stdout.read(READ_SIZE)
+        if not data:
+            break
+        buffer += data
+        
+        start = 0
+        pos = buffer.find(COMMIT_BOUNDARY, search_from)
+        while pos != -1:
+            yield bytes(buffer[start:pos + 1])
+            start = pos + 1
+            pos = buffer.find(COMMIT_BOUNDARY, start)
+        del buffer[:start]
+        # A boundary may be split across reads, so rescan its first byte
+        search_from = max(len(buffer) - 1, 0)
+    
+    if buffer:
+        yield bytes(buffer)
+
+
+def iter_chunks(items: Iterator[bytes], size: int) -> Iterator[List[bytes]]:
+    """Group items into lists of at most `size` elements."""
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parse_numstat(line: bytes) -> Tuple[int, int]:
+    """
+    Parse a file's line counts from git log --numstat output.
+    
+    Format: added<TAB>deleted<TAB>path
+    Binary files show "-" for both counts and are reported as (0, 0).
+    """
+    added, deleted, _ = line.split(b"\t", 2)
+    if added == b"-":
+        return (0, 0)
+    return (int(added), int(deleted))
 
 
-def get_commit_details(repo_path: str, commit_hash: str, org: str, repo: str) -> Optional[Dict]:
-    """Extract detailed information about a specific commit."""
-    stdout, returncode = run_git_command(
-        repo_path,
-        [
-            "show",
-            "--raw",
-            "--pretty=format:%ct%x00%aN%x00%P%x00%s%x00",
-            "--patch",
-            "--unified=0",
-            commit_hash
-        ]
-    )
+def diff_section_path(section: bytes) -> Optional[str]:
+    """
+    Get the file path a diff section belongs to (the new path for renames/copies).
     
-    if returncode != 0 or not stdout:
+    Format: diff --git a/path b/path
+    For renames/copies the section also has "rename to path" / "copy to path" lines.
+    """
+    header_end = section.find(b"\n")
+    if header_end == -1:
         return None
+    names = section[len(DIFF_HEADER) - 1:header_end]
+    
+    # Unless renamed, both names are the same path, so split in the middle
+    # (like git does) which also works for paths containing spaces
+    name_length = (len(names) - 5) // 2
+    path = names[2:2 + name_length]
+    if names.startswith(b"a/") and names[2 + name_length:] == b" b/" + path:
+        return path.decode('utf-8', errors='replace')
+    
+    for marker in (b"\nrename to ", b"\ncopy to "):
+        pos = section.find(marker, header_end)
+        if pos != -1:
+            pos += len(marker)
+            end = section.find(b"\n", pos)
+            return section[pos:end if end != -1 else len(section)].decode('utf-8', errors='replace')
     
-    lines = stdout.split("\n")
-    if not lines:
+    return None
+
+
+def parse_commit(block: bytes, org: str, repo: str) -> Optional[Dict]:
+    """Extract detailed information about a commit from its streamed git log block."""
+    if not block.startswith(COMMIT_START):
         return None
     
-    # Parse header (first line with null-separated values)
-    header_parts = lines[0].split("\x00")
-    if len(header_parts) < 4:
+    header_end = block.find(b"\n")
+    if header_end == -1:
+        header_end = len(block)
+    header = block[len(COMMIT_START):header_end]
+    
+    # Parse header (hash, timestamp, author, parents, subject separated by FIELD_SEP)
+    header_parts = header.split(FIELD_SEP, 4)
+    if len(header_parts) < 5:
         return None
     
-    timestamp = int(header_parts[0])
-    author = header_parts[1]
-    parents = header_parts[2].split() if header_parts[2] else []
-    message = header_parts[3] if len(header_parts) > 3 else ""
+    commit_hash = header_parts[0].decode('ascii')
+    timestamp = int(header_parts[1])
+    author = header_parts[2].decode('utf-8', errors='replace')
+    parents = header_parts[3].split() if header_parts[3] else []
+    message = header_parts[4].decode('utf-8', errors='replace')
     
-    # Convert timestamp to readable format
-    dt = datetime.fromtimestamp(timestamp)
-    time_str = dt.strftime("%Y-%m-%d %H:%M:%S")
+    # Convert timestamp to readable (local) time; time.strftime on a struct_time
+    # avoids building a datetime object for every commit
+    time_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp))
     
     # Parse file changes and diff
-    # Git shows all : lines first, then all diff sections
-    # So we need to collect : lines first, then match diffs to files
+    # Git shows all : lines first, then all diff sections, so a single scan
+    # finds where the raw lines end and where each diff section starts
+    
+    diff_section_starts = []
+    pos = block.find(DIFF_HEADER, header_end)
+    while pos != -1:
+        diff_section_starts.append(pos + 1)
+        pos = block.find(DIFF_HEADER, pos + 1)
+    raw_end = diff_section_starts[0] if diff_section_starts else len(block)
+    diff_section_starts.append(len(block))
     
     file_changes_dict = {}  # path -> file_change dict
     file_changes_list = []  # preserve order
-    
-    # First pass: collect all file changes from : lines
-    for line in lines[1:]:
-        if line.startswith(":"):
-            file_change = parse_file_change(line)
-            if file_change:
-                path = file_change["path"]
-                # For renames, also index by old_path for matching
-                file_changes_dict[path] = file_change
-                file_changes_list.append(path)
-                if file_change.get("old_path") and file_change["old_path"] != path:
-                    file_changes_dict[file_change["old_path"]] = file_change
-    
-    # Second pass: collect and match diff sections to files
-    current_file_path = None
-    current_diff_lines = []
-    
-    for line in lines[1:]:
-        if line.startswith(":"):
-            # We've already processed these, skip
+    numstat_lines = []  # only present when run with --numstat instead of --patch
+    
+    # Collect all file changes from : lines, walking them by offset so no list
+    # of lines is built
+    pos = header_end + 1
+    while pos < raw_end:
+        line_end = block.find(b"\n", pos, raw_end)
+        if line_end == -1:
+            line_end = raw_end
+        raw_line = block[pos:line_end]
+        pos = line_end + 1
+        
+        if not raw_line.startswith(b":"):
+            if raw_line.count(b"\t") >= 2:
+                numstat_lines.append(raw_line)
             continue
-        elif line.startswith("diff --git"):
-            # Save previous file's diff if exists
-            if current_file_path and current_diff_lines:
-                file_change_to_update = find_file_change_by_path(file_changes_dict, current_file_path)
-                if file_change_to_update:
-                    # Update the file_change in place (since it's a reference)
-                    updated_fc = analyze_diff(current_diff_lines, file_change_to_update)
-                    # Update both path entries if it's a rename
-                    file_changes_dict[file_change_to_update["path"]] = updated_fc
-                    if file_change_to_update.get("old_path") and file_change_to_update["old_path"] != file_change_to_update["path"]:
-                        file_changes_dict[file_change_to_update["old_path"]] = updated_fc
-            
-            # Extract file path from "diff --git a/path b/path" or "diff --git a/path b/newpath"
-            # Format: diff --git a/oldpath b/newpath
-            # For deletes: diff --git a/path /dev/null
-            # For adds: diff --git /dev/null b/path
-            parts = line.split()
-            if len(parts) >= 4:
-                a_path = parts[2].replace("a/", "", 1) if parts[2].startswith("a/") else None
-                b_path = parts[3].replace("b/", "", 1) if parts[3].startswith("b/") else None
-                
-                # Determine which path to use - prefer b_path (new path), fallback to a_path
-                if b_path and b_path != "/dev/null":
-                    current_file_path = b_path
-                elif a_path and a_path != "/dev/null":
-                    current_file_path = a_path
-                else:
-                    current_file_path = None
-                
-                current_diff_lines = [line] if current_file_path else []
-            else:
-                current_file_path = None
-                current_diff_lines = []
-        elif current_file_path:
-            # Check if this path matches any file_change
-            matching_fc = find_file_change_by_path(file_changes_dict, current_file_path)
-            if matching_fc:
-                # Capture all diff-related lines
-                if (line.startswith("index ") or
-                    line.startswith("---") or 
-                    line.startswith("+++") or
-                    line.startswith("@@") or
-                    line.startswith("+") or 
-                    line.startswith("-") or 
-                    line.startswith(" ") or
-                    line.startswith("\\") or
-                    line == ""):
-                    current_diff_lines.append(line)
-    
-    # Save last file's diff
-    if current_file_path and current_diff_lines:
-        file_change_to_update = find_file_change_by_path(file_changes_dict, current_file_path)
-        if file_change_to_update:
-            updated_fc = analyze_diff(current_diff_lines, file_change_to_update)
-            file_changes_dict[file_change_to_update["path"]] = updated_fc
-            if file_change_to_update.get("old_path") and file_change_to_update["old_path"] != file_change_to_update["path"]:
-                file_changes_dict[file_change_to_update["old_path"]] = updated_fc
+        file_change = parse_file_change(raw_line)
+        if file_change:
+            path = file_change["path"]
+            # For renames, also index by old_path for matching (without shadowing
+            # another file_change whose new path is the same)
+            file_changes_dict[path] = file_change
+            file_changes_list.append(path)
+            if file_change.get("old_path") and file_change["old_path"] != path:
+                file_changes_dict.setdefault(file_change["old_path"], file_change)
+    
+    # Match each diff section to its file change and analyze it in place
+    for start, end in zip(diff_section_starts, diff_section_starts[1:]):
+        section = block[start:end]
+        file_change = file_changes_dict.get(diff_section_path(section))
+        if file_change:
+            analyze_diff(section, file_change)
     
     # Convert back to list in original order
-    file_changes = [file_changes_dict[path] for path in file_changes_list if path in file_changes_dict]
-    
-    # Calculate totals
-    files_added = sum(1 for fc in file_changes if fc["change_type"] == "Add")
-    files_deleted = sum(1 for fc in file_changes if fc["change_type"] == "Delete")
-    files_renamed = sum(1 for fc in file_changes if fc["change_type"] == "Rename")
-    files_modified = sum(1 for fc in file_changes if fc["change_type"] == "Modify")
-    lines_added = sum(fc["lines_added"] for fc in file_changes)
-    lines_deleted = sum(fc["lines_deleted"] for fc in file_changes)
-    hunks_added = sum(fc["hunks_added"] for fc in file_changes)
-    hunks_removed = sum(fc["hunks_removed"] for fc in file_changes)
-    hunks_changed = sum(fc["hunks_changed"] for fc in file_changes)
+    file_changes = [file_changes_dict[path] for path in file_changes_list]
+    
+    # Without diff sections, take line counts from numstat, which git lists in
+    # the same order as the : lines
+    if numstat_lines:
+        if len(numstat_lines) == len(file_changes):
+            numstat_matches = zip(file_changes, numstat_lines)
+        else:
+            numstat_matches = (
+                (file_changes_dict.get(line.split(b"\t", 2)[2].decode('utf-8', errors='replace')), line)
+                for line in numstat_lines
+            )
+        for file_change, line in numstat_matches:
+            if file_change:
+                file_change["lines_added"], file_change["lines_deleted"] = parse_numstat(line)
+    
+    # Calculate totals in a single pass over the file changes, counting files
+    # per change type with a dict lookup rather than an if/elif chain
+    files_by_change_type = dict.fromkeys(CHANGE_TYPES.values(), 0)
+    lines_added = lines_deleted = 0
+    hunks_added = hunks_removed = hunks_changed = 0
+    for fc in file_changes:
+        files_by_change_type[fc["change_type"]] += 1
+        lines_added += fc["lines_added"]
+        lines_deleted += fc["lines_deleted"]
+        hunks_added += fc["hunks_added"]
+        hunks_removed += fc["hunks_removed"]
+        hunks_changed += fc["hunks_changed"]
     
     # Determine if this is a merge commit (has more than one parent)
     is_merge = len(parents) > 1
@@ -388,10 +493,10 @@ def get_commit_details(repo_path: str, commit_hash: str, org: str, repo: str) ->
         "time": time_str,
         "message": message,
         "merge": is_merge,
-        "files_added": files_added,
-        "files_deleted": files_deleted,
-        "files_renamed": files_renamed,
-        "files_modified": files_modified,
+        "files_added": files_by_change_type["Add"],
+        "files_deleted": files_by_change_type["Delete"],
+        "files_renamed": files_by_change_type["Rename"],
+        "files_modified": files_by_change_type["Modify"],
         "lines_added": lines_added,
         "lines_deleted": lines_deleted,
         "hunks_added": hunks_added,
@@ -401,68 +506,223 @@ def get_commit_details(repo_path: str, commit_hash: str, org: str, repo: str) ->
     }
 
 
-def process_single_commit(args: Tuple[str, str, str, str]) -> Optional[Dict]:
-    """Worker function to process a single commit. Returns commit data or None."""
-    repo_path, commit_hash, org, repo = args
-    return get_commit_details(repo_path, commit_hash, org, repo)
+def dump_json_line(obj: Dict) -> bytes:
+    """Serialize obj as a single UTF-8 JSON line (with trailing newline)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(obj) + "\n").encode("utf-8")
+
+
+def _init_worker(org: str, repo: str):
+    """Initialize a parse worker with the repository its commits belong to."""
+    global _worker_org, _worker_repo
+    _worker_org = org
+    _worker_repo = repo
+
+
+def process_commit(block: bytes) -> bytes:
+    """Worker function to parse a single streamed commit. Returns a JSON line or b"" if unparseable."""
+    commit = parse_commit(block, _worker_org, _worker_repo)
+    if not commit:
+        return b""
+    return dump_json_line(commit)
+
+
+def process_commit_chunk(blocks: List[bytes]) -> bytes:
+    """Worker function to parse a chunk of streamed commits into concatenated JSON lines."""
+    return b"".join(process_commit(block) for block in blocks)
 
 
-def writer_process(queue: Queue, output_path: str, batch_size: int):
-    """Writer process that consumes commits from queue and writes to file in batches."""
-    batch_buffer = []
+def open_output(output_path: str) -> IO[bytes]:
+    """Open the output file for writing, compressed according to its extension."""
+    if output_path.endswith(".zst"):
+        # zstd compresses JSON better than gzip and uses multiple threads
+        return zstd.ZstdCompressor(level=3, threads=-1).stream_writer(open(output_path, "wb"))
+    return gzip.open(output_path, "wb", compresslevel=1)
+
+
+class WriterError(Exception):
+    """Raised in a reader when the writer thread has stopped on an error."""
+
+
+def writer_thread(queue: Queue, output_path: str, failed: threading.Event, errors: List[BaseException]):
+    """
+    Writer thread that consumes batches of serialized commits (JSON lines) from queue and writes them to file.
+
+    If writing fails, the exception is appended to errors and failed is set, so
+    that readers stop instead of blocking on a queue nobody consumes.
+    """
     total_commits = 0
     
-    with gzip.open(output_path, "wt", encoding="utf-8") as f:
-        while True:
-            commit = queue.get()
-            if commit is DONE:
-                # Flush remaining buffer
-                if batch_buffer:
-                    for c in batch_buffer:
-                        f.write(json.dumps(c) + "\n")
-                    total_commits += len(batch_buffer)
-                break
-            
-            batch_buffer.append(commit)
-            if len(batch_buffer) >= batch_size:
-                for c in batch_buffer:
-                    f.write(json.dumps(c) + "\n")
-                total_commits += len(batch_buffer)
-                batch_buffer = []
+    try:
+        with open_output(output_path) as f:
+            while True:
+                batch = queue.get()
+                if batch is DONE:
+                    break
+                
+                f.write(batch)
+                total_commits += batch.count(b"\n")
                 print(f"  Written {total_commits} commits...", file=sys.stderr, end="\r")
+    except BaseException as e:
+        errors.append(e)
+        failed.set()
+        return
     
     print(f"\nDone! Wrote {total_commits} commits to {output_path}", file=sys.stderr)
 
 
-def process_repository(repo_path: str, queue: Queue):
-    """Reader: Process a single repository and put commits into queue."""
+def put_batch(queue: Queue, batch: Optional[bytes], writer_failed: threading.Event):
+    """Put a batch on the writer queue, raising WriterError if the writer fails while waiting."""
+    while not writer_failed.is_set():
+        try:
+            queue.put(batch, timeout=WRITER_POLL_INTERVAL)
+            return
+        except Full:
+            continue
+    raise WriterError()
+
+
+def read_commit_cache(cache_path: str) -> Iterator[Tuple[bytes, bytes]]:
+    """
+    Read (hash, JSON line) pairs from a commit cache file.
+
+    A cache file holds one serialized commit per line, exactly as written to the
+    output. A last line left incomplete by an interrupted run is cut off so that
+    appending to the cache can resume cleanly.
+    """
+    with open(cache_path, "r+b") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                f.truncate(f.tell() - len(line))
+                break
+            match = _CACHED_HASH_RE.match(line)
+            if match:
+                yield match.group(1), line
+
+
+def process_repository(repo_path: str, queue: Queue, writer_failed: threading.Event, batch_size: int, skip_hunks: bool = False, cache_dir: Optional[str] = None):
+    """Reader: Process a single repository and put batches of serialized commits into queue."""
     print(f"Processing repository: {repo_path}", file=sys.stderr)
     
     if not os.path.isdir(repo_path) or not is_git_repo(repo_path):
         print(f"Error: {repo_path} is not a valid Git repository", file=sys.stderr)
         return
     
-    commit_hashes = get_commit_hashes(repo_path)
-    if not commit_hashes:
-        print(f"Warning: No commits found in {repo_path}", file=sys.stderr)
-        return
-    
     org, repo = get_repo_info(repo_path)
-    print(f"  Repository: {org}/{repo} ({len(commit_hashes)} commits)", file=sys.stderr)
-    
-    num_workers = 10 * cpu_count()
-    commit_args = [(repo_path, h, org, repo) for h in commit_hashes]
+    print(f"  Repository: {org}/{repo}", file=sys.stderr)
     
+    # Hand commits to the writer in batches so each queue.put covers
+    # batch_size commits instead of one
     completed = 0
-    with Pool(processes=num_workers) as pool:
-        for result in pool.imap_unordered(process_single_commit, commit_args):
-            completed += 1
-            if result:
-                queue.put(result)
-            if completed % 100 == 0 or completed == len(commit_hashes):
-                print(f"  Progress: {completed}/{len(commit_hashes)}...", file=sys.stderr, end="\r")
+    batch = []
+    batch_commits = 0
+    
+    def emit(lines):
+        nonlocal completed, batch, batch_commits
+        num_commits = lines.count(b"\n")
+        batch.append(lines)
+        batch_commits += num_commits
+        completed += num_commits
+        if batch_commits >= batch_size:
+            put_batch(queue, b"".join(batch), writer_failed)
+            batch = []
+            batch_commits = 0
+    
+    # With a cache, reuse the commits extracted by earlier runs that are still
+    # in the history, and only have git produce the others
+    cache_file = None
+    hashes_to_extract = None  # None extracts the whole history
+    reused = 0
+    if cache_dir:
+        cache_path = os.path.join(cache_dir, f"{org}__{repo}.v{CACHE_FORMAT_VERSION}{'.numstat' if skip_hunks else ''}.jsonl")
+        if os.path.exists(cache_path):
+            stdout, returncode = run_git_command(repo_path, ["rev-list", "--reverse", "HEAD"])
+            if returncode == 0:
+                history = stdout.split()
+                in_history = set(history)
+                cached_hashes = set()
+                for commit_hash, line in read_commit_cache(cache_path):
+                    if commit_hash in in_history and commit_hash not in cached_hashes:
+                        cached_hashes.add(commit_hash)
+                        emit(line)
+                reused = len(cached_hashes)
+                hashes_to_extract = [h for h in history if h not in cached_hashes]
+        cache_file = open(cache_path, "ab")
+    
+    # Stream every commit from a single git process instead of running `git show` per commit
+    if skip_hunks:
+        # --numstat gives per-file line counts without git generating any diff text
+        diff_args = ["--numstat"]
+    else:
+        diff_args = ["--patch", "--unified=0"]
+    if hashes_to_extract is None:
+        proc = stream_git(
+            repo_path,
+            ["log", "--reverse", "--raw"] + diff_args + [LOG_FORMAT]
+        )
+    elif hashes_to_extract:
+        proc = stream_git(
+            repo_path,
+            ["log", "--no-walk=unsorted", "--stdin", "--raw"] + diff_args + [LOG_FORMAT],
+            b"".join(h + b"\n" for h in hashes_to_extract)
+        )
+    else:
+        proc = None
+    
+    # Parsing is CPU bound, so use one worker process per core and keep only a
+    # bounded number of chunks in flight so the stream is never fully buffered
+    num_workers = cpu_count()
+    max_pending = 2 * num_workers
+    pending = deque()
+    
+    def collect(future):
+        lines = future.result()
+        if cache_file:
+            cache_file.write(lines)
+        emit(lines)
+        print(f"  Progress: {completed}...", file=sys.stderr, end="\r")
     
-    print(f"\n  Completed {repo_path}", file=sys.stderr)
+    try:
+        if proc is not None:
+            with ProcessPoolExecutor(
+                max_workers=num_workers,
+                mp_context=get_context(WORKER_START_METHOD),
+                initializer=_init_worker,
+                initargs=(org, repo)
+            ) as executor:
+                for chunk in iter_chunks(iter_commits(proc.stdout), CHUNK_SIZE):
+                    pending.append(executor.submit(process_commit_chunk, chunk))
+                    if len(pending) >= max_pending:
+                        collect(pending.popleft())
+                while pending:
+                    collect(pending.popleft())
+    except BaseException:
+        # Don't leave git running (blocked on a full pipe) if parsing stopped early
+        if proc is not None:
+            proc.kill()
+        raise
+    finally:
+        if proc is not None:
+            proc.stdout.close()
+            proc.wait()
+        if cache_file:
+            cache_file.close()
+    
+    if batch_commits:
+        put_batch(queue, b"".join(batch), writer_failed)
+    
+    if completed == 0:
+        print(f"Warning: No commits found in {repo_path}", file=sys.stderr)
+        return
+    
+    if proc is not None and proc.returncode != 0:
+        print(f"\nWarning: git log exited with status {proc.returncode} for {repo_path}; some commits may be missing", file=sys.stderr)
+    
+    if cache_dir:
+        print(f"\n  Completed {repo_path} ({completed} commits, {reused} from cache)", file=sys.stderr)
+    else:
+        print(f"\n  Completed {repo_path} ({completed} commits)", file=sys.stderr)
 
 
 def main():
@@ -482,13 +742,22 @@ def main():
     parser.add_argument(
         "--output",
         default="commits.json.gz",
-        help="Output file path (default: commits.json.gz)"
+        help="Output file path, zstd compressed if it ends in .zst and gzip compressed otherwise (default: commits.json.gz)"
     )
     parser.add_argument(
         "--batch-size",
         type=int,
-        default=10000,
-        help="Number of commits to write in each batch (default: 10000)"
+        default=256,
+        help="Number of commits handed to the writer in each batch (default: 256)"
+    )
+    parser.add_argument(
+        "--skip-hunks",
+        action="store_true",
+        help="Take line counts from git log --numstat instead of full diffs; much faster, but hunk counts are reported as 0"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="Directory for per-repository caches of extracted commits; commits already in the cache are not extracted again on later runs"
     )
     
     args = parser.parse_args()
@@ -516,28 +785,48 @@ def main():
                 print(f"Warning: '{parent}' is not a directory. Skipping.", file=sys.stderr)
                 continue
             print(f"Scanning parent directory: {parent_path}", file=sys.stderr)
-            for child in sorted(parent_path.iterdir()):
-                if (child / ".git").is_dir():
-                    add_repo(child)
+            # scandir entries know whether they are directories without an extra
+            # stat, so .git is only checked for subdirectories
+            with os.scandir(parent_path) as it:
+                subdirs = sorted((entry for entry in it if entry.is_dir()), key=lambda entry: entry.name)
+            for entry in subdirs:
+                if os.path.isdir(os.path.join(entry.path, ".git")):
+                    add_repo(entry.path)
     
     if not repo_paths:
         parser.error("No repositories provided. Use --repos and/or --parent-dir.")
     
+    if args.output.endswith(".zst") and zstd is None:
+        parser.error("Writing .zst output requires the zstandard package (pip install zstandard).")
+    
+    if args.cache_dir:
+        os.makedirs(args.cache_dir, exist_ok=True)
+    
     # Create queue for reader-writer communication
-    queue = Queue()
+    queue = Queue(maxsize=WRITER_QUEUE_SIZE)
+    writer_failed = threading.Event()
+    writer_errors = []
     
-    # Start writer process
-    writer = Process(target=writer_process, args=(queue, args.output, args.batch_size))
+    # Start writer thread; it only writes already serialized bytes and
+    # compressing releases the GIL, so it does not need its own process
+    writer = threading.Thread(target=writer_thread, args=(queue, args.output, writer_failed, writer_errors), daemon=True)
     writer.start()
     
     # Process repositories (readers)
     print(f"Processing {len(repo_paths)} repositories (batch size: {args.batch_size})...", file=sys.stderr)
-    for repo_path in repo_paths:
-        process_repository(repo_path, queue)
-    
-    # Signal writer that all commits are done
-    queue.put(DONE)
+    try:
+        for repo_path in repo_paths:
+            process_repository(repo_path, queue, writer_failed, args.batch_size, args.skip_hunks, args.cache_dir)
+        
+        # Signal writer that all commits are done
+        put_batch(queue, DONE, writer_failed)
+    except WriterError:
+        pass
     writer.join()
+    
+    if writer_failed.is_set():
+        print(f"\nError: failed to write {args.output}: {writer_errors[0]!r}", file=sys.stderr)
+        sys.exit(1)
 
 
 if __name__ == "__main__":